@@ -0,0 +1,84 @@
+"""
+On-disk TTL cache for market data responses
+Keeps repeated cron runs from hitting Yahoo Finance / Kraken every time
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+class FileCache:
+    """JSON blobs stored under .cache/<md5(key)>.json"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key, ttl=None):
+        """Return cached payload, or None if missing, unreadable or older than ttl seconds"""
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+            if ttl is not None and time.time() - entry['ts'] >= ttl:
+                return None
+            return entry['payload']
+        except (OSError, ValueError, KeyError, TypeError):
+            # A malformed entry is treated as a miss and overwritten on the next set()
+            return None
+
+    def set(self, key, payload):
+        """Store payload with the current timestamp"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'ts': time.time(), 'payload': payload}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Failed to write cache: {e}")
+
+def content_signature(*parts):
+    """Stable sha1 hex digest of JSON-serializable parts"""
+    return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+def cached(url, ttl=30, headers=None):
+    """Cache a fetch function's result on disk, keyed by (url, User-Agent)
+
+    Failed fetches (None) are never cached. Works for plain and async functions.
+    """
+    user_agent = (headers or {}).get('User-Agent', '')
+    key = f"{url}|{user_agent}"
+    cache = FileCache()
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                payload = cache.get(key, ttl)
+                if payload is None:
+                    payload = await func(*args, **kwargs)
+                    if payload is not None:
+                        cache.set(key, payload)
+                return payload
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            payload = cache.get(key, ttl)
+            if payload is None:
+                payload = func(*args, **kwargs)
+                if payload is not None:
+                    cache.set(key, payload)
+            return payload
+        return wrapper
+
+    return decorator
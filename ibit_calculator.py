@@ -4,13 +4,17 @@ IBIT Strike to BTC Price Calculator with Google Sheets integration
 Displays table with Strike Price and corresponding BTC hedge levels
 """
 
-import requests
+import atexit
 import json
+import functools
 import os
 import sys
-import time
+import numpy as np
 from datetime import datetime
 
+from cache import FileCache, cached, content_signature
+from retry import retry
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -18,9 +22,19 @@ try:
 except ImportError:
     print("python-dotenv not available, using system environment variables")
 
+# Faster JSON decoding when orjson is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Google Sheets integration (optional)
 SHEETS_AVAILABLE = False
 
+# Authorized (client, spreadsheet) pairs keyed by (credentials file, sheet id)
+_client_cache = {}
+
+@functools.lru_cache(maxsize=1)
 def import_sheets_modules():
     """Safely import Google Sheets modules"""
     global SHEETS_AVAILABLE
@@ -41,6 +55,29 @@ class Config:
     CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', 'service-account-key.json')
     SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
     WORKSHEET_ID = int(os.getenv('GOOGLE_WORKSHEET_ID'))
+    
+    # Seconds a fetched price is reused from the on-disk cache
+    PRICE_CACHE_TTL = int(os.getenv('PRICE_CACHE_TTL', 30))
+    
+    # Minimum rows written per upload (header + table, blank-padded). Shared by both
+    # scripts and large enough for the longest layout either writes (ETHA: 10 + 121 rows).
+    SHEET_MAX_ROWS = 150
+
+def current_timestamp():
+    """Current local time as shown in the terminal, sheet and log output"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# Sheet header; rows 2-5 (timestamp, prices, ratio) are filled per upload
+_HEADER_TEMPLATE = [
+    ['IBIT Strike to BTC Price Calculator'],
+    [''],
+    None,
+    None,
+    None,
+    None,
+    [''],
+    ['Strike Price', 'BTC Price']
+]
 
 class SheetsManager:
     """Google Sheets connection and data management"""
@@ -65,67 +102,79 @@ class SheetsManager:
             print(f"❌ Credentials file not found: {Config.CREDENTIALS_FILE}")
             return False
             
-        max_retries = 3
-        retry_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-                creds = self.Credentials.from_service_account_file(Config.CREDENTIALS_FILE, scopes=scope)
-                self.gc = self.gspread.authorize(creds)
-                self.sheet = self.gc.open_by_key(Config.SHEET_ID)
-                self.worksheet = self.sheet.get_worksheet_by_id(Config.WORKSHEET_ID)
-                print("✅ Connected to Google Sheets")
-                return True
-                
-            except Exception as e:
-                print(f"❌ Sheets connection attempt {attempt + 1}/{max_retries} failed: {e}")
-                if attempt < max_retries - 1:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    print("❌ All Google Sheets connection attempts failed")
-                    return False
+        try:
+            self._connect()
+            print("✅ Connected to Google Sheets")
+            return True
+        except Exception:
+            print("❌ All Google Sheets connection attempts failed")
+            return False
     
-    def upload_to_sheets(self, table_data, ibit_price, btc_price, ratio):
+    @retry(tries=3, base_delay=2, label="Sheets connection")
+    def _connect(self):
+        """Authorize (or reuse the cached client) and open the configured worksheet"""
+        cache_key = (Config.CREDENTIALS_FILE, Config.SHEET_ID)
+        if cache_key not in _client_cache:
+            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+            creds = self.Credentials.from_service_account_file(Config.CREDENTIALS_FILE, scopes=scope)
+            gc = self.gspread.authorize(creds)
+            _client_cache[cache_key] = (gc, gc.open_by_key(Config.SHEET_ID))
+        self.gc, self.sheet = _client_cache[cache_key]
+        self.worksheet = self.sheet.get_worksheet_by_id(Config.WORKSHEET_ID)
+    
+    def _write_all(self, all_data):
+        """Overwrite the upload block with all_data in a single values.update"""
+        # Pad with blank rows down to the longest block last written to this tab (by either
+        # script, via the shared .cache), so leftovers are overwritten without a clear()
+        rows_key = f"last_rows|{Config.SHEET_ID}|{self.worksheet.id}"
+        rows_cache = FileCache()
+        previous_rows = rows_cache.get(rows_key)
+        if not isinstance(previous_rows, int):
+            previous_rows = 0
+        rows = max(Config.SHEET_MAX_ROWS, previous_rows, len(all_data))
+        padded = all_data + [['', '']] * (rows - len(all_data))
+        self.worksheet.update(range_name=f'A1:B{rows}', values=padded, value_input_option='USER_ENTERED')
+        rows_cache.set(rows_key, len(all_data))
+    
+    def upload_to_sheets(self, table_data, ibit_price, btc_price, ratio, timestamp=None):
         """Upload strike table data to Google Sheets"""
         if not self.worksheet:
             print("❌ No worksheet available for upload")
             return False
             
         try:
-            # Clear existing data first
-            print("📝 Clearing existing sheet data...")
-            self.worksheet.clear()
-            
             # Prepare header data
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            header_data = [
-                ['IBIT Strike to BTC Price Calculator'],
-                [''],
-                [f'Updated: {timestamp}'],
-                [f'IBIT Price: ${ibit_price:,.2f}'],
-                [f'BTC Price: ${btc_price:,.2f}'],
-                [f'Ratio: {ratio:,.1f}'],
-                [''],
-                ['Strike Price', 'BTC Price']
-            ]
+            timestamp = timestamp or current_timestamp()
+            header_data = list(_HEADER_TEMPLATE)
+            header_data[2] = [f'Updated: {timestamp}']
+            header_data[3] = [f'IBIT Price: ${ibit_price:,.2f}']
+            header_data[4] = [f'BTC Price: ${btc_price:,.2f}']
+            header_data[5] = [f'Ratio: {ratio:,.1f}']
             
             # Prepare table data
-            table_rows = []
-            for row in table_data:
-                table_rows.append([
-                    f'${row["strike"]:.2f}',
-                    f'${row["btc_price"]:,.2f}'
-                ])
+            strikes, btc_levels = table_data
+            # tolist() converts both columns to Python floats in one C-level pass
+            table_rows = [
+                [f'${strike:.2f}', f'${btc_level:,.2f}']
+                for strike, btc_level in zip(strikes.tolist(), btc_levels.tolist())
+            ]
+            
+            # Skip the write when the rendered cells (all but the Updated row) would not change.
+            # The ratio is derived from both prices, so hash the formatted output, not the inputs.
+            sig_key = f"last_sig_ibit|{Config.SHEET_ID}|{self.worksheet.id}"
+            sig = content_signature(header_data[:2] + header_data[3:], table_rows)
+            sig_cache = FileCache()
+            if sig_cache.get(sig_key) == sig:
+                print("⏭️  Prices unchanged since last upload, skipping Google Sheets write")
+                return True
             
             # Combine all data
             all_data = header_data + table_rows
             
             # Upload to sheets
             print("📊 Uploading data to Google Sheets...")
-            self.worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
+            self._write_all(all_data)
+            sig_cache.set(sig_key, sig)
             
             print(f"✅ Data uploaded to Google Sheets at {timestamp}")
             return True
@@ -134,14 +183,38 @@ class SheetsManager:
             print(f"❌ Error uploading to Google Sheets: {e}")
             return False
 
+IBIT_URL = "https://query1.finance.yahoo.com/v8/finance/chart/IBIT"
+KRAKEN_URL = "https://futures.kraken.com/derivatives/api/v3/tickers/PF_XBTUSD"
+UA = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
+
+# Shared session so repeated fetches reuse warm TCP/TLS connections.
+# requests is imported on first use, so cache-hit runs never load it.
+_session = None
+
+def get_session():
+    """Return the shared requests session, creating it on first use"""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        _session.headers.update(UA)
+        _session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return _session
+
+# requests.RequestException subclasses OSError, so this avoids importing requests here
+@retry(tries=3, base_delay=1.0, exceptions=(OSError,))
+def fetch_json(url):
+    """GET a URL through the shared session and decode its JSON body"""
+    response = get_session().get(url, timeout=10)
+    response.raise_for_status()
+    return json_loads(response.content)
+
+@cached(IBIT_URL, ttl=Config.PRICE_CACHE_TTL, headers=UA)
 def get_ibit_price():
     """Získa aktuálnu cenu IBIT z Yahoo Finance API"""
     try:
-        url = "https://query1.finance.yahoo.com/v8/finance/chart/IBIT"
-        headers = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_json(IBIT_URL)
         
         ibit_price = data['chart']['result'][0]['meta']['regularMarketPrice']
         print(f"📈 IBIT Price: ${ibit_price:,.2f}")
@@ -151,56 +224,70 @@ def get_ibit_price():
         print(f"❌ Error getting IBIT price: {e}")
         return None
 
+# Known Kraken response shapes, tried in order. 'path' leads to indexPrice directly,
+# or to a ticker array searched for the entry whose 'key' equals 'match'.
+_TICKER_MATCH = {'key': 'symbol', 'match': 'PF_XBTUSD', 'field': 'indexPrice'}
+KRAKEN_SHAPES = (
+    {'path': ['result', 'indexPrice']},                       # {"result": {"indexPrice": "..."}}
+    {'path': ['result', 'PF_XBTUSD', 'indexPrice']},          # {"result": {"PF_XBTUSD": {...}}}
+    {'path': ['result', 'tickers'], **_TICKER_MATCH},         # {"result": {"tickers": [...]}}
+    {'path': ['result'], **_TICKER_MATCH},                    # {"result": [...]}
+    {'path': [], **_TICKER_MATCH},                            # [...]
+)
+# The shape that last matched is remembered in .cache and tried first next run
+KRAKEN_SHAPE_KEY = "kraken_shape"
+
+def _walk(data, path):
+    """Follow a list of keys into nested JSON, raising KeyError/TypeError on a miss"""
+    for key in path:
+        data = data[key]
+    return data
+
+def _lookup_kraken_shape(data, shape):
+    """Read indexPrice from data using one response shape, raising on a miss"""
+    value = _walk(data, shape['path'])
+    if 'match' in shape:
+        if not isinstance(value, list):
+            raise TypeError("expected a ticker array")
+        ticker = next((t for t in value if isinstance(t, dict) and t.get(shape['key']) == shape['match']), None)
+        value = ticker[shape['field']]
+    return float(value)
+
+def find_kraken_index_price(data):
+    """Return PF_XBTUSD indexPrice from any known Kraken response shape, or None"""
+    shape_cache = FileCache()
+    known_shape = shape_cache.get(KRAKEN_SHAPE_KEY)
+    candidates = KRAKEN_SHAPES if known_shape is None else (known_shape,) + KRAKEN_SHAPES
+    
+    for shape in candidates:
+        try:
+            btc_price = _lookup_kraken_shape(data, shape)
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        if shape != known_shape:
+            shape_cache.set(KRAKEN_SHAPE_KEY, shape)
+        return btc_price
+    
+    return None
+
+@cached(KRAKEN_URL, ttl=Config.PRICE_CACHE_TTL, headers=UA)
 def get_btc_price():
     """Získa BTC index price z Kraken Futures API"""
     try:
-        url = "https://futures.kraken.com/derivatives/api/v3/tickers/PF_XBTUSD"
-        headers = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_json(KRAKEN_URL)
         
         # Debug: print response structure (optional)
         # print(f"Debug - API response keys: {data.keys()}")
         
-        # Handle different possible response structures
-        tickers = None
-        if 'result' in data:
-            if isinstance(data['result'], dict):
-                if 'tickers' in data['result']:
-                    # Structure: {"result": {"tickers": [...]}}
-                    tickers = data['result']['tickers']
-                elif 'indexPrice' in data['result']:
-                    # Direct structure: {"result": {"indexPrice": "..."}}
-                    btc_price = float(data['result']['indexPrice'])
-                    print(f"₿ BTC Price: ${btc_price:,.2f}")
-                    return btc_price
-                else:
-                    # Structure: {"result": {"PF_XBTUSD": {"indexPrice": "..."}}}
-                    if 'PF_XBTUSD' in data['result']:
-                        btc_price = float(data['result']['PF_XBTUSD']['indexPrice'])
-                        print(f"₿ BTC Price: ${btc_price:,.2f}")
-                        return btc_price
-            elif isinstance(data['result'], list):
-                # Structure: {"result": [{"symbol": "PF_XBTUSD", ...}]}
-                tickers = data['result']
-        else:
-            # Direct array structure
-            tickers = data
-        
-        # Search in tickers array
-        if tickers:
-            for ticker in tickers:
-                if ticker.get('symbol') == 'PF_XBTUSD':
-                    btc_price = float(ticker['indexPrice'])
-                    print(f"₿ BTC Price: ${btc_price:,.2f}")
-                    return btc_price
+        btc_price = find_kraken_index_price(data)
+        if btc_price is not None:
+            print(f"₿ BTC Price: ${btc_price:,.2f}")
+            return btc_price
         
         # Fallback to CoinGecko if Kraken fails
         print("⚠️  Kraken API structure unexpected, trying CoinGecko...")
         fallback_url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
-        fallback_response = requests.get(fallback_url, timeout=10)
-        fallback_data = fallback_response.json()
+        fallback_data = fetch_json(fallback_url)
         btc_price = fallback_data['bitcoin']['usd']
         print(f"₿ BTC Price (CoinGecko): ${btc_price:,.2f}")
         return btc_price
@@ -210,49 +297,55 @@ def get_btc_price():
         return None
 
 def calculate_strike_table(ibit_price, btc_price, strike_range=(25, 80)):
-    """Vypočíta tabuľku strike prices a corresponding BTC levels"""
+    """Vypočíta tabuľku strike prices a corresponding BTC levels
+
+    Returns ((strikes, btc_levels), ratio) where both columns are float64 arrays.
+    """
     ratio = btc_price / ibit_price
     
-    table_data = []
-    for strike in range(strike_range[0], strike_range[1] + 1):
-        btc_hedge_level = strike * ratio
-        table_data.append({
-            'strike': strike,
-            'btc_price': btc_hedge_level
-        })
+    strikes = np.arange(strike_range[0], strike_range[1] + 1, dtype=np.float64)
+    btc_levels = strikes * ratio
     
-    print(f"📊 Generated {len(table_data)} strike price levels (Ratio: {ratio:,.1f})")
-    return table_data, ratio
+    print(f"📊 Generated {len(strikes)} strike price levels (Ratio: {ratio:,.1f})")
+    return (strikes, btc_levels), ratio
 
-def print_table(table_data, ibit_price, btc_price, ratio):
+def print_table(table_data, ibit_price, btc_price, ratio, timestamp=None):
     """Vypíše formatovanú tabuľku do terminálu"""
+    timestamp = timestamp or current_timestamp()
+    
     # Clear terminal output first (optional)
     # print("\033[H\033[J", end="")
     
     # Header
-    print("\n" + "=" * 80)
-    print("IBIT STRIKE TO BTC PRICE CALCULATOR")
-    print("=" * 80)
-    print(f"IBIT Price: ${ibit_price:,.2f}")
-    print(f"BTC Price:  ${btc_price:,.2f}")
-    print(f"Ratio:      {ratio:,.1f}")
-    print(f"Updated:    {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 80)
-    
-    # Table header
-    print(f"{'Strike Price':<15} | {'BTC Hedge Level':<15}")
-    print("-" * 80)
+    lines = [
+        "",
+        "=" * 80,
+        "IBIT STRIKE TO BTC PRICE CALCULATOR",
+        "=" * 80,
+        f"IBIT Price: ${ibit_price:,.2f}",
+        f"BTC Price:  ${btc_price:,.2f}",
+        f"Ratio:      {ratio:,.1f}",
+        f"Updated:    {timestamp}",
+        "=" * 80,
+        # Table header
+        f"{'Strike Price':<15} | {'BTC Hedge Level':<15}",
+        "-" * 80,
+    ]
     
     # Table rows
-    for row in table_data:
-        strike = row['strike']
-        btc_price_level = row['btc_price']
-        print(f"{strike:<14.2f} | ${btc_price_level:<14,.2f}")
+    strikes, btc_levels = table_data
+    lines.extend(
+        f"{strike:<14.2f} | ${btc_price_level:<14,.2f}"
+        for strike, btc_price_level in zip(strikes.tolist(), btc_levels.tolist())
+    )
+    lines.append("=" * 80)
     
-    print("=" * 80)
+    # One write instead of a print() per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     """Main function with optional Google Sheets integration"""
+    timestamp = current_timestamp()
     print("🚀 Starting IBIT Strike to BTC Price Calculator...")
     print("📊 Fetching market data...")
     
@@ -261,21 +354,21 @@ def main():
     btc_price = get_btc_price()
     
     if not ibit_price or not btc_price:
-        print(f"❌ [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Failed to fetch market data")
+        print(f"❌ [{timestamp}] ERROR: Failed to fetch market data")
         return 1
     
     # Calculate strike table
     table_data, ratio = calculate_strike_table(ibit_price, btc_price)
     
     # Print results to terminal
-    print_table(table_data, ibit_price, btc_price, ratio)
+    print_table(table_data, ibit_price, btc_price, ratio, timestamp=timestamp)
     
     # Optional Google Sheets integration
     print("\n📈 Attempting to update Google Sheets...")
     sheets_manager = SheetsManager()
     
     if sheets_manager.setup_sheets():
-        if sheets_manager.upload_to_sheets(table_data, ibit_price, btc_price, ratio):
+        if sheets_manager.upload_to_sheets(table_data, ibit_price, btc_price, ratio, timestamp=timestamp):
             print("✅ Google Sheets updated successfully")
         else:
             print("⚠️  Google Sheets update failed, but calculation completed")
@@ -285,17 +378,32 @@ def main():
     print("\n✅ IBIT Calculator completed successfully")
     return 0
 
-def log_to_file(table_data, ibit_price, btc_price, ratio):
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+LOG_FILE = os.path.join(LOG_DIR, 'ibit_prices.log')
+
+# Line-buffered append handle, opened on first log_to_file call
+_LOG_FH = None
+
+@functools.lru_cache(maxsize=1)
+def _ensure_logdir():
+    """Create the log directory once per process"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+def _log_handle():
+    """Return the shared log file handle, opening it on first use"""
+    global _LOG_FH
+    if _LOG_FH is None:
+        _ensure_logdir()
+        _LOG_FH = open(LOG_FILE, 'a', buffering=1)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
+
+def log_to_file(table_data, ibit_price, btc_price, ratio, timestamp=None):
     """Optional: Save results to log file"""
     try:
-        log_dir = os.path.dirname(os.path.abspath(__file__)) + "/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, 'ibit_prices.log')
-        
-        with open(log_file, 'a') as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"{timestamp},IBIT:{ibit_price},BTC:{btc_price},RATIO:{ratio:.1f}\n")
-        print(f"📝 Logged to {log_file}")
+        timestamp = timestamp or current_timestamp()
+        _log_handle().write(f"{timestamp},IBIT:{ibit_price},BTC:{btc_price},RATIO:{ratio:.1f}\n")
+        print(f"📝 Logged to {LOG_FILE}")
     except Exception as e:
         print(f"⚠️  Failed to write log file: {e}")
 
@@ -0,0 +1,51 @@
+"""
+Exponential-backoff retry decorator for flaky network calls
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+
+def retry(tries=3, base_delay=1.0, exceptions=(Exception,), label=None):
+    """Retry the wrapped call up to `tries` times, sleeping base_delay * 2**attempt between attempts
+
+    The last exception is re-raised once all attempts fail. Works for plain and async functions.
+    """
+    def decorator(func):
+        name = label or func.__name__
+
+        def on_failure(attempt, e):
+            print(f"❌ {name} attempt {attempt + 1}/{tries} failed: {e}")
+            if attempt == tries - 1:
+                return None
+            delay = base_delay * 2 ** attempt
+            print(f"⏳ Retrying in {delay:g} seconds...")
+            return delay
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(tries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        delay = on_failure(attempt, e)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(tries):
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as e:
+                    delay = on_failure(attempt, e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        return wrapper
+
+    return decorator
@@ -1,9 +1,16 @@
-import requests
+import aiohttp
+import asyncio
+import functools
 import os
 import sys
 import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from cache import FileCache, cached, content_signature
+from retry import retry
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -11,9 +18,19 @@ try:
 except ImportError:
     print("python-dotenv not available, using system environment variables")
 
+# Faster JSON decoding when orjson is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Google Sheets integration
 SHEETS_AVAILABLE = False
 
+# Authorized (client, spreadsheet) pairs keyed by (credentials file, sheet id)
+_client_cache = {}
+
+@functools.lru_cache(maxsize=1)
 def import_sheets_modules():
     """Safely import Google Sheets modules"""
     global SHEETS_AVAILABLE
@@ -36,13 +53,53 @@ class Config:
     
     # Fixed BlackRock ratio (Aug 29, 2025: 746,810.57340 BTC ÷ 1,314,880,000 shares)
     BTC_PER_IBIT_RATIO = 746810.57340 / 1314880000
+    INV_BTC_PER_IBIT_RATIO = 1.0 / BTC_PER_IBIT_RATIO
     
     # ETHA Configuration
     ETHA_UNITS = float(os.getenv('ETHA_UNITS', 3777263.17140))
     ETHA_SHARES_OUTSTANDING = float(os.getenv('ETHA_SHARES_OUTSTANDING', 499320000))
     ETHA_RATIO = ETHA_UNITS / ETHA_SHARES_OUTSTANDING
+    INV_ETHA_RATIO = 1.0 / ETHA_RATIO
     GOOGLE_WORKSHEET_ID_2 = int(os.getenv('GOOGLE_WORKSHEET_ID_2', 1))
     
+    # Seconds a fetched price is reused from the on-disk cache
+    PRICE_CACHE_TTL = int(os.getenv('PRICE_CACHE_TTL', 30))
+    
+    # Minimum rows written per upload (header + table, blank-padded). Shared by both
+    # scripts and large enough for the longest layout either writes (ETHA: 10 + 121 rows).
+    SHEET_MAX_ROWS = 150
+    
+def current_timestamp():
+    """Current local time as shown in the terminal, sheet and log output"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# Sheet headers; rows 2 (Updated) and 3 (Current price) are filled per upload
+_IBIT_HEADER_TEMPLATE = [
+    ['IBIT Strike to BTC Price Calculator'],
+    [''],
+    None,
+    None,
+    ['Shares Outstanding: 1,314,880,000'],
+    ['IBIT BTC units: 746,810.57340'],
+    [f'Formula: BTC = IBIT ÷ {Config.BTC_PER_IBIT_RATIO}'],
+    [f'BlackRock Official Ratio: {Config.BTC_PER_IBIT_RATIO}'],
+    [''],
+    ['IBIT Strike Price', 'BTC Equivalent Price']
+]
+
+_ETHA_HEADER_TEMPLATE = [
+    ['ETHA Strike to BTC Price Calculator'],
+    [''],
+    None,
+    None,
+    [f'Shares Outstanding: {Config.ETHA_SHARES_OUTSTANDING:,.0f}'],
+    [f'ETHA ETH units: {Config.ETHA_UNITS:,.5f}'],
+    [f'Formula: BTC = ETHA ÷ {Config.ETHA_RATIO:.10f}'],
+    [f'ETHA Official Ratio: {Config.ETHA_RATIO:.10f}'],
+    [''],
+    ['ETHA Strike Price', 'BTC Equivalent Price']
+]
+
 class SheetsManager:
     """Google Sheets connection and data management"""
     
@@ -65,10 +122,13 @@ class SheetsManager:
             return False
             
         try:
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = self.Credentials.from_service_account_file(Config.CREDENTIALS_FILE, scopes=scope)
-            self.gc = self.gspread.authorize(creds)
-            self.sheet = self.gc.open_by_key(Config.SHEET_ID)
+            cache_key = (Config.CREDENTIALS_FILE, Config.SHEET_ID)
+            if cache_key not in _client_cache:
+                scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+                creds = self.Credentials.from_service_account_file(Config.CREDENTIALS_FILE, scopes=scope)
+                gc = self.gspread.authorize(creds)
+                _client_cache[cache_key] = (gc, gc.open_by_key(Config.SHEET_ID))
+            self.gc, self.sheet = _client_cache[cache_key]
             # Use provided worksheet_id or default
             target_worksheet_id = worksheet_id if worksheet_id is not None else Config.WORKSHEET_ID
             self.worksheet = self.sheet.get_worksheet_by_id(target_worksheet_id)
@@ -78,63 +138,71 @@ class SheetsManager:
             print(f"❌ Sheets connection failed: {e}")
             return False
     
-    def set_worksheet(self, worksheet_id):
-        """Set the active worksheet"""
+    def get_worksheet(self, worksheet_id):
+        """Return a worksheet of the open spreadsheet, or None"""
+        if self.worksheet is not None and self.worksheet.id == worksheet_id:
+            return self.worksheet
         try:
             if self.sheet:
-                self.worksheet = self.sheet.get_worksheet_by_id(worksheet_id)
-                return True
-            return False
+                return self.sheet.get_worksheet_by_id(worksheet_id)
+            return None
         except Exception as e:
-            print(f"❌ Error setting worksheet {worksheet_id}: {e}")
+            print(f"❌ Error getting worksheet {worksheet_id}: {e}")
+            return None
+    
+    def set_worksheet(self, worksheet_id):
+        """Set the active worksheet"""
+        worksheet = self.get_worksheet(worksheet_id)
+        if worksheet is None:
             return False
+        self.worksheet = worksheet
+        return True
     
-    def upload_to_sheets(self, table_data, current_price, etf_type="IBIT"):
-        """Upload strike table data to Google Sheets"""
-        if not self.worksheet:
+    def _write_all(self, worksheet, all_data):
+        """Overwrite the upload block with all_data in a single values.update"""
+        # Pad with blank rows down to the longest block last written to this tab (by either
+        # script, via the shared .cache), so leftovers are overwritten without a clear()
+        rows_key = f"last_rows|{Config.SHEET_ID}|{worksheet.id}"
+        rows_cache = FileCache()
+        previous_rows = rows_cache.get(rows_key)
+        if not isinstance(previous_rows, int):
+            previous_rows = 0
+        rows = max(Config.SHEET_MAX_ROWS, previous_rows, len(all_data))
+        padded = all_data + [['', '']] * (rows - len(all_data))
+        worksheet.update(range_name=f'A1:B{rows}', values=padded, value_input_option='USER_ENTERED')
+        rows_cache.set(rows_key, len(all_data))
+    
+    def upload_to_sheets(self, table_data, current_price, etf_type="IBIT", worksheet=None, timestamp=None):
+        """Upload strike table data to Google Sheets (active worksheet unless one is given)"""
+        worksheet = worksheet or self.worksheet
+        if not worksheet:
             return False
             
         try:
-            self.worksheet.clear()
+            timestamp = timestamp or current_timestamp()
             
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            header_data = list(_IBIT_HEADER_TEMPLATE if etf_type == "IBIT" else _ETHA_HEADER_TEMPLATE)
+            header_data[2] = [f'Updated: {timestamp}']
+            header_data[3] = [f'Current {etf_type} Price: ${current_price:,.2f}']
             
-            if etf_type == "IBIT":
-                header_data = [
-                    ['IBIT Strike to BTC Price Calculator'],
-                    [''],
-                    [f'Updated: {timestamp}'],
-                    [f'Current IBIT Price: ${current_price:,.2f}'],
-                    [f'Shares Outstanding: 1,314,880,000'],
-                    [f'IBIT BTC units: 746,810.57340'],
-                    [f'Formula: BTC = IBIT ÷ {Config.BTC_PER_IBIT_RATIO}'],
-                    [f'BlackRock Official Ratio: {Config.BTC_PER_IBIT_RATIO}'],
-                    [''],
-                    ['IBIT Strike Price', 'BTC Equivalent Price']
-                ]
-            else:  # ETHA
-                header_data = [
-                    ['ETHA Strike to BTC Price Calculator'],
-                    [''],
-                    [f'Updated: {timestamp}'],
-                    [f'Current ETHA Price: ${current_price:,.2f}'],
-                    [f'Shares Outstanding: {Config.ETHA_SHARES_OUTSTANDING:,.0f}'],
-                    [f'ETHA ETH units: {Config.ETHA_UNITS:,.5f}'],
-                    [f'Formula: BTC = ETHA ÷ {Config.ETHA_RATIO:.10f}'],
-                    [f'ETHA Official Ratio: {Config.ETHA_RATIO:.10f}'],
-                    [''],
-                    ['ETHA Strike Price', 'BTC Equivalent Price']
-                ]
+            strikes, btc_equivalents = table_data
+            # tolist() converts both columns to Python floats in one C-level pass
+            table_rows = [
+                [f'${strike:.2f}', f'${btc_equivalent:,.2f}']
+                for strike, btc_equivalent in zip(strikes.tolist(), btc_equivalents.tolist())
+            ]
             
-            table_rows = []
-            for row in table_data:
-                table_rows.append([
-                    f'${row["strike"]:.2f}',
-                    f'${row["btc_equivalent"]:,.2f}'
-                ])
+            # Skip the write when the rendered cells (all but the Updated row) would not change
+            sig_key = f"last_sig_{etf_type.lower()}|{Config.SHEET_ID}|{worksheet.id}"
+            sig = content_signature(header_data[:2] + header_data[3:], table_rows)
+            sig_cache = FileCache()
+            if sig_cache.get(sig_key) == sig:
+                print(f"⏭️  {etf_type} prices unchanged since last upload, skipping Google Sheets write")
+                return True
             
             all_data = header_data + table_rows
-            self.worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
+            self._write_all(worksheet, all_data)
+            sig_cache.set(sig_key, sig)
             print(f"✅ {etf_type} data uploaded to Google Sheets")
             return True
             
@@ -142,14 +210,21 @@ class SheetsManager:
             print(f"❌ Error uploading {etf_type} to Google Sheets: {e}")
             return False
 
-def get_ibit_price():
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+UA = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
+
+@retry(tries=3, base_delay=1.0, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+async def fetch_json(session, url):
+    """Fetch a URL and decode its JSON body"""
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        response.raise_for_status()
+        return json_loads(await response.read())
+
+@cached(YAHOO_CHART_URL.format(symbol="IBIT"), ttl=Config.PRICE_CACHE_TTL, headers=UA)
+async def get_ibit_price(session):
     """Get current IBIT price from Yahoo Finance"""
     try:
-        url = "https://query1.finance.yahoo.com/v8/finance/chart/IBIT"
-        headers = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = await fetch_json(session, YAHOO_CHART_URL.format(symbol="IBIT"))
         
         ibit_price = data['chart']['result'][0]['meta']['regularMarketPrice']
         print(f"📈 IBIT Price: ${ibit_price:,.2f}")
@@ -159,14 +234,11 @@ def get_ibit_price():
         print(f"❌ Error getting IBIT price: {e}")
         return None
 
-def get_etha_price():
+@cached(YAHOO_CHART_URL.format(symbol="ETHA"), ttl=Config.PRICE_CACHE_TTL, headers=UA)
+async def get_etha_price(session):
     """Get current ETHA price from Yahoo Finance"""
     try:
-        url = "https://query1.finance.yahoo.com/v8/finance/chart/ETHA"
-        headers = {'User-Agent': 'Mozilla/5.0 (Linux; Ubuntu) AppleWebKit/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = await fetch_json(session, YAHOO_CHART_URL.format(symbol="ETHA"))
         
         etha_price = data['chart']['result'][0]['meta']['regularMarketPrice']
         print(f"📈 ETHA Price: ${etha_price:,.2f}")
@@ -176,98 +248,96 @@ def get_etha_price():
         print(f"❌ Error getting ETHA price: {e}")
         return None
 
+async def fetch_prices():
+    """Fetch IBIT and ETHA prices concurrently"""
+    # One session and connection pool for both Yahoo requests
+    connector = aiohttp.TCPConnector(limit=4)
+    async with aiohttp.ClientSession(headers=UA, connector=connector) as session:
+        return await asyncio.gather(get_ibit_price(session), get_etha_price(session))
+
 def calculate_strike_table(strike_range=(25, 80)):
-    """Calculate BTC equivalent for each IBIT strike using fixed formula"""
-    table_data = []
-    
+    """Calculate BTC equivalent for each IBIT strike using fixed formula
+
+    Returns a (strikes, btc_equivalents) pair of float64 arrays.
+    """
     # Generate strikes in 0.5 increments
-    strike = strike_range[0]
-    while strike <= strike_range[1]:
-        # Formula: Bitcoin Price = IBIT Price ÷ 0.000568058
-        btc_equivalent = strike / Config.BTC_PER_IBIT_RATIO
-        
-        table_data.append({
-            'strike': strike,
-            'btc_equivalent': btc_equivalent
-        })
-        
-        strike += 0.5  # Increment by 0.5
+    strikes = np.arange(strike_range[0], strike_range[1] + 0.5, 0.5, dtype=np.float64)
+    # Formula: Bitcoin Price = IBIT Price ÷ 0.000568058
+    btc_equivalents = strikes * Config.INV_BTC_PER_IBIT_RATIO
     
-    print(f"📊 Generated {len(table_data)} strike levels using formula: BTC = IBIT ÷ {Config.BTC_PER_IBIT_RATIO}")
-    return table_data
+    print(f"📊 Generated {len(strikes)} strike levels using formula: BTC = IBIT ÷ {Config.BTC_PER_IBIT_RATIO}")
+    return strikes, btc_equivalents
 
 def calculate_etha_strike_table(strike_range=(25, 80)):
-    """Calculate BTC equivalent for each ETHA strike using ETHA ratio"""
-    table_data = []
-    
+    """Calculate BTC equivalent for each ETHA strike using ETHA ratio
+
+    Returns a (strikes, btc_equivalents) pair of float64 arrays.
+    """
     # Generate strikes in 0.5 increments
-    strike = strike_range[0]
-    while strike <= strike_range[1]:
-        # Formula: BTC Equivalent = ETHA Price / ETHA_RATIO
-        btc_equivalent = strike / Config.ETHA_RATIO
-        
-        table_data.append({
-            'strike': strike,
-            'btc_equivalent': btc_equivalent
-        })
-        
-        strike += 0.5  # Increment by 0.5
+    strikes = np.arange(strike_range[0], strike_range[1] + 0.5, 0.5, dtype=np.float64)
+    # Formula: BTC Equivalent = ETHA Price / ETHA_RATIO
+    btc_equivalents = strikes * Config.INV_ETHA_RATIO
     
-    print(f"📊 Generated {len(table_data)} ETHA strike levels using ratio: {Config.ETHA_RATIO:.10f}")
-    return table_data
+    print(f"📊 Generated {len(strikes)} ETHA strike levels using ratio: {Config.ETHA_RATIO:.10f}")
+    return strikes, btc_equivalents
 
-def print_table(table_data, current_price, etf_type="IBIT"):
+def print_table(table_data, current_price, etf_type="IBIT", timestamp=None):
     """Print formatted table to terminal"""
+    timestamp = timestamp or current_timestamp()
+    
     if etf_type == "IBIT":
-        current_btc_equivalent = current_price / Config.BTC_PER_IBIT_RATIO
+        current_btc_equivalent = current_price * Config.INV_BTC_PER_IBIT_RATIO
         ratio = Config.BTC_PER_IBIT_RATIO
         title = "IBIT STRIKE TO BTC PRICE CALCULATOR"
         strike_label = "IBIT Strike"
     else:  # ETHA
-        current_btc_equivalent = current_price / Config.ETHA_RATIO
+        current_btc_equivalent = current_price * Config.INV_ETHA_RATIO
         ratio = Config.ETHA_RATIO
         title = "ETHA STRIKE TO BTC PRICE CALCULATOR"
         strike_label = "ETHA Strike"
     
-    print("\n" + "=" * 80)
-    print(title)
-    print("=" * 80)
-    print(f"Current {etf_type} Price: ${current_price:,.2f}")
-    print(f"Current BTC Equivalent: ${current_btc_equivalent:,.2f}")
-    print(f"Formula: BTC = {etf_type} ÷ {ratio:.10f}")
-    print(f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 80)
+    lines = [
+        "",
+        "=" * 80,
+        title,
+        "=" * 80,
+        f"Current {etf_type} Price: ${current_price:,.2f}",
+        f"Current BTC Equivalent: ${current_btc_equivalent:,.2f}",
+        f"Formula: BTC = {etf_type} ÷ {ratio:.10f}",
+        f"Updated: {timestamp}",
+        "=" * 80,
+        f"{strike_label:<15} | {'BTC Equivalent':<15}",
+        "-" * 80,
+    ]
     
-    print(f"{strike_label:<15} | {'BTC Equivalent':<15}")
-    print("-" * 80)
+    strikes, btc_equivalents = table_data
+    # Highlight current level
+    highlights = np.where(np.abs(strikes - current_price) < 2, " 🎯", "").tolist()
+    lines.extend(
+        f"${strike:<14.2f} | ${btc_equivalent:<14,.2f}{highlight}"
+        for strike, btc_equivalent, highlight in zip(strikes.tolist(), btc_equivalents.tolist(), highlights)
+    )
     
-    for row in table_data:
-        strike = row['strike']
-        btc_equivalent = row['btc_equivalent']
-        
-        # Highlight current level
-        highlight = " 🎯" if abs(strike - current_price) < 2 else ""
-        
-        print(f"${strike:<14.2f} | ${btc_equivalent:<14,.2f}{highlight}")
+    lines.append("=" * 80)
+    lines.append(f"🎯 = Near current {etf_type} price")
     
-    print("=" * 80)
-    print(f"🎯 = Near current {etf_type} price")
+    # One write instead of a print() per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     """Main function"""
+    timestamp = current_timestamp()
     print("🚀 Starting IBIT & ETHA Strike Calculator...")
     print(f"🔢 Using formulas:")
     print(f"   IBIT: Bitcoin Price = IBIT Price ÷ {Config.BTC_PER_IBIT_RATIO}")
     print(f"   ETHA: Bitcoin Price = ETHA Price ÷ {Config.ETHA_RATIO:.10f}")
     
-    # Get IBIT price
-    ibit_price = get_ibit_price()
+    # Get IBIT and ETHA prices (both requests run concurrently)
+    ibit_price, etha_price = asyncio.run(fetch_prices())
     if not ibit_price:
         print("❌ Failed to fetch IBIT price")
         return 1
     
-    # Get ETHA price
-    etha_price = get_etha_price()
     if not etha_price:
         print("❌ Failed to fetch ETHA price")
         return 1
@@ -277,32 +347,36 @@ def main():
     etha_table_data = calculate_etha_strike_table((10, 70))
     
     # Print results
-    print_table(ibit_table_data, ibit_price, "IBIT")
-    print_table(etha_table_data, etha_price, "ETHA")
+    print_table(ibit_table_data, ibit_price, "IBIT", timestamp=timestamp)
+    print_table(etha_table_data, etha_price, "ETHA", timestamp=timestamp)
     
-    # Update Google Sheets for IBIT
-    print("\n📊 Attempting to update IBIT Google Sheets...")
-    ibit_sheets_manager = SheetsManager()
+    # Update Google Sheets: one authorized client, both tabs uploaded concurrently
+    print("\n📊 Attempting to update IBIT & ETHA Google Sheets...")
+    sheets_manager = SheetsManager()
+    sheets_manager.setup_sheets(Config.WORKSHEET_ID)
     
-    if ibit_sheets_manager.setup_sheets(Config.WORKSHEET_ID):
-        if ibit_sheets_manager.upload_to_sheets(ibit_table_data, ibit_price, "IBIT"):
-            print("✅ IBIT Google Sheets updated successfully")
-        else:
-            print("⚠️  IBIT Google Sheets update failed")
-    else:
-        print("⚠️  Continuing without IBIT Google Sheets")
+    def upload(etf_type, worksheet_id, table_data, current_price):
+        # Each thread works on its own Worksheet reference
+        worksheet = sheets_manager.get_worksheet(worksheet_id)
+        if worksheet is None:
+            return None
+        return sheets_manager.upload_to_sheets(table_data, current_price, etf_type, worksheet=worksheet, timestamp=timestamp)
     
-    # Update Google Sheets for ETHA
-    print("\n📊 Attempting to update ETHA Google Sheets...")
-    etha_sheets_manager = SheetsManager()
+    uploads = [
+        ("IBIT", Config.WORKSHEET_ID, ibit_table_data, ibit_price),
+        ("ETHA", Config.GOOGLE_WORKSHEET_ID_2, etha_table_data, etha_price),
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(upload, *args) for args in uploads]
+        results = [future.result() for future in futures]
     
-    if etha_sheets_manager.setup_sheets(Config.GOOGLE_WORKSHEET_ID_2):
-        if etha_sheets_manager.upload_to_sheets(etha_table_data, etha_price, "ETHA"):
-            print("✅ ETHA Google Sheets updated successfully")
+    for (etf_type, *_), result in zip(uploads, results):
+        if result is None:
+            print(f"⚠️  Continuing without {etf_type} Google Sheets")
+        elif result:
+            print(f"✅ {etf_type} Google Sheets updated successfully")
         else:
-            print("⚠️  ETHA Google Sheets update failed")
-    else:
-        print("⚠️  Continuing without ETHA Google Sheets")
+            print(f"⚠️  {etf_type} Google Sheets update failed")
     
     print(f"\n✅ Calculator completed")
     print(f"   IBIT Formula: BTC = IBIT ÷ {Config.BTC_PER_IBIT_RATIO}")